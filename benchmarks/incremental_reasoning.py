@@ -0,0 +1,59 @@
+"""
+compares the latency of full and incremental reasoning for scenes that differ
+from their predecessor in a given number of values; beyond the generator's
+max_changes, incremental mode falls back to building a fresh world
+
+    python -m benchmarks.incremental_reasoning
+"""
+import time
+from dataclasses import fields, replace
+from typing import List
+
+from cc_gen.generator import SceneGenerator
+from cc_gen.root_domain import create_root_domain
+from cc_gen.variation import Scene, EntityInstance, InstanceValues, Kind, Direction
+
+BASE_IRI = "http://occd-bench.com"
+ROUNDS = 5
+
+
+def base_scene() -> Scene:
+    return [
+        EntityInstance(Kind.Ego, 'ego', InstanceValues(25, Direction.North, 1.8, 4.5, 1.6, 0, 0)),
+        *[EntityInstance(Kind.Vehicle, f'car_{i}', InstanceValues(0, Direction.North, 1.8, 4.5, 1.5, 3.5, 6 * i - 3))
+          for i in range(2)],
+        *[EntityInstance(Kind.Pedestrian, f'ped_{i}', InstanceValues(3, Direction.West, .5, .3, 1.7, 1 + i, 2 * i))
+          for i in range(3)]
+    ]
+
+
+def mutate(scene: Scene, changes: int) -> Scene:
+    """ shifts the first `changes` numeric values of the scene """
+    numeric = [(i, f.name) for i, e in enumerate(scene) for f in fields(e.values) if f.name != 'orientation']
+    result = list(scene)
+    for i, name in numeric[:changes]:
+        entity = result[i]
+        result[i] = replace(entity, values=replace(entity.values, **{name: getattr(entity.values, name) + .5}))
+    return result
+
+
+def latency(scenes: List[Scene], incremental: bool) -> float:
+    """ mean seconds per scene, not counting the first one """
+    generator = iter(SceneGenerator(scenes, create_root_domain, BASE_IRI, incremental=incremental))
+    next(generator)
+    start = time.perf_counter()
+    for _ in generator:
+        pass
+    return (time.perf_counter() - start) / (len(scenes) - 1)
+
+
+def main():
+    scene = base_scene()
+    print(f"{'changed values':>15} {'full [s]':>10} {'incremental [s]':>16}")
+    for changes in (0, 1, 2, 4, 7, 8, 16):
+        scenes = [scene, mutate(scene, changes)] * ROUNDS
+        print(f"{changes:>15} {latency(scenes, False):>10.3f} {latency(scenes, True):>16.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,24 +1,56 @@
 import math
-from typing import Callable, Iterator, Tuple, Dict, Any, List, Optional
+from dataclasses import fields
+from typing import Callable, Iterable, Iterator, Tuple, Dict, Any, List, Optional
 from matplotlib import transforms
 from owlready2 import Ontology, World, sync_reasoner_pellet, Thing
-from cc_gen.variation import VariationDimensions, Scene, Kind, EntityInstance
+from cc_gen.variation import Scene, Kind, EntityInstance
 import matplotlib.pyplot as plt
 
 
+"""
+the ontology attributes set from each field of the instance values
+"""
+FIELD_ATTRIBUTES = {
+    'velocity': ['velocity'],
+    'orientation': ['direction'],
+    'width': ['width'],
+    'length': ['length'],
+    'height': ['height'],
+    'distance_lat': ['lateral_distance', 'euclidean_distance'],
+    'distance_long': ['longitudinal_distance', 'euclidean_distance']
+}
+
+
 class SceneGenerator:
     def __init__(self,
-                 variation_dimensions: VariationDimensions,
+                 variation_dimensions: Iterable[Optional[Scene]],
                  domain_factory: Callable[[Ontology], None],
                  base_iri: str,
                  max_tries: Optional[int] = None,
-                 debug: bool = False):
+                 debug: bool = False,
+                 incremental: bool = False,
+                 max_changes: int = 7):
+        """
+        generates a reasoned ontology for every scene of the variation dimensions,
+        or of any other stream of scenes (None marking an implausible one).
+
+        in incremental mode, a single world is kept alive: if a scene differs from the previous
+        one in at most max_changes values (by default, one entity's worth), only the changed
+        data properties are set and the world is re-reasoned in place; otherwise a fresh world
+        is built. the inferred facts are kept in a separate ontology of the world, and the
+        yielded ontology reflects the current scene only until the next one is requested.
+        """
         self.variation_dimensions = variation_dimensions
         self.domain_factory = domain_factory
         self.base_iri = base_iri
         self.iterations = 0
         self.max_tries = max_tries
         self.debug = debug
+        self.incremental = incremental
+        self.max_changes = max_changes
+        self._ontology: Optional[Ontology] = None
+        self._asserted_parents: Dict[Any, List[Any]] = {}
+        self._scene: Optional[Scene] = None
 
     @property
     def num_rounds(self):
@@ -78,56 +110,121 @@ class SceneGenerator:
         plt.savefig(file)
         plt.close()
 
+    @staticmethod
+    def entity_attributes(x: EntityInstance, ontology: Ontology) -> Dict[str, Any]:
+        result = {
+            'velocity': x.values.velocity,
+            'direction': ontology.Direction.from_string(x.values.orientation),
+            'length': x.values.length,
+            'width': x.values.width,
+            'height': x.values.height,
+            'lateral_distance': x.values.distance_lat,
+            'longitudinal_distance': x.values.distance_long,
+            'euclidean_distance': math.sqrt((x.values.distance_lat or 0) ** 2 +
+                                            (x.values.distance_long or 0) ** 2)
+        }
+        return result
+
     @staticmethod
     def instantiate_scene(scene: Scene, ontology: Ontology) -> Ontology:
         with ontology:
-            def common_attributes(x: EntityInstance) -> Dict[str, Any]:
-                result = {
-                    'velocity': x.values.velocity,
-                    'direction': ontology.Direction.from_string(x.values.orientation),
-                    'length': x.values.length,
-                    'width': x.values.width,
-                    'height': x.values.height,
-                    'lateral_distance': x.values.distance_lat,
-                    'longitudinal_distance': x.values.distance_long,
-                    'euclidean_distance': math.sqrt((x.values.distance_lat or 0) ** 2 +
-                                                    (x.values.distance_long or 0) ** 2)
-                }
-                return result
-
             entities: Dict[str, Tuple[EntityInstance, Thing]] = {}
 
             for car in [e for e in scene if e.kind == Kind.Vehicle]:
-                car_onto = ontology.Car(car.name, **common_attributes(car))
+                car_onto = ontology.Car(car.name, **SceneGenerator.entity_attributes(car, ontology))
                 entities[car.name] = (car, car_onto)
 
             for ped in [e for e in scene if e.kind == Kind.Pedestrian]:
-                ped_onto = ontology.Pedestrian(ped.name, **common_attributes(ped))
+                ped_onto = ontology.Pedestrian(ped.name, **SceneGenerator.entity_attributes(ped, ontology))
                 entities[ped.name] = (ped, ped_onto)
 
             for ego in [e for e in scene if e.kind == Kind.Ego]:
-                ego_onto = ontology.EgoCar(ego.name, **common_attributes(ego))
+                ego_onto = ontology.EgoCar(ego.name, **SceneGenerator.entity_attributes(ego, ontology))
                 entities[ego.name] = (ego, ego_onto)
 
             return ontology
 
+    @staticmethod
+    def changed_fields(previous: Scene, scene: Scene) -> Optional[List[Tuple[EntityInstance, str]]]:
+        """ the entities and fields in which two scenes differ, None if they consist of different entities """
+        if [(e.kind, e.name) for e in previous] != [(e.kind, e.name) for e in scene]:
+            return None
+        return [(b, f.name)
+                for a, b in zip(previous, scene)
+                for f in fields(a.values)
+                if getattr(a.values, f.name) != getattr(b.values, f.name)]
+
+    @property
+    def inferred_iri(self) -> str:
+        return f"{self.base_iri}/inferred"
+
+    def reason(self, ontology: Ontology, target=None):
+        try:
+            sync_reasoner_pellet(x=target or ontology.world,
+                                 infer_data_property_values=True,
+                                 infer_property_values=True,
+                                 debug=self.debug)
+        except Exception as e:
+            ontology.save("error.rdf.xml")
+            raise e
+
+    def create_world(self, index: int, scene: Scene) -> Ontology:
+        world = World(backend='sqlite', filename=':memory:', dbname=f"scene_db_{index:04}")
+        with world.get_ontology(self.base_iri) as onto:
+            self.domain_factory(onto)
+            self.instantiate_scene(scene, onto)
+            if not self.incremental:
+                self.reason(onto)
+                return onto
+
+            self._asserted_parents = dict((e, list(e.is_a))
+                                          for e in [*onto.classes(), *onto.properties(), *onto.individuals()])
+        # keep inferences apart from the asserted facts, so that they can be retracted
+        self.reason(onto, world.get_ontology(self.inferred_iri))
+        return onto
+
+    def update_world(self, changes: List[Tuple[EntityInstance, str]]) -> Ontology:
+        onto = self._ontology
+        onto.world.get_ontology(self.inferred_iri).destroy()
+        with onto:
+            # the reasoner reparents entities on the python side only, undo this
+            # (the asserted triples are still in place and are not added twice)
+            for entity, parents in self._asserted_parents.items():
+                if list(entity.is_a) != parents:
+                    entity.is_a = list(parents)
+
+            # values cached by owlready may stem from the retracted inferences
+            names = [p.python_name for p in onto.world.properties()]
+            for individual in onto.individuals():
+                for name in names:
+                    if name in vars(individual):
+                        delattr(individual, name)
+
+            for entity, field in changes:
+                individual = onto[entity.name]
+                attributes = self.entity_attributes(entity, onto)
+                for name in FIELD_ATTRIBUTES[field]:
+                    setattr(individual, name, attributes[name])
+        self.reason(onto, onto.world.get_ontology(self.inferred_iri))
+        return onto
+
+    def reason_scene(self, index: int, scene: Scene) -> Ontology:
+        if not self.incremental:
+            return self.create_world(index, scene)
+
+        changes = self.changed_fields(self._scene, scene) if self._scene is not None else None
+        if changes is None or len(changes) > self.max_changes:
+            self._ontology = self.create_world(index, scene)
+        elif changes:
+            self.update_world(changes)
+        self._scene = scene
+        return self._ontology
+
     def __iter__(self) -> Iterator[Optional[Tuple[Ontology, Scene]]]:
         for index, scene in enumerate(self.variation_dimensions):
             self.iterations += 1
             if scene is not None:
-                world = World(backend='sqlite', filename=':memory:', dbname=f"scene_db_{index:04}")
-                with world.get_ontology(self.base_iri) as onto:
-                    self.domain_factory(onto)
-                    self.instantiate_scene(scene, onto)
-
-                    try:
-                        sync_reasoner_pellet(x=world,
-                                             infer_data_property_values=True,
-                                             infer_property_values=True,
-                                             debug=self.debug)
-                    except Exception as e:
-                        onto.save("error.rdf.xml")
-                        raise e
+                with self.reason_scene(index, scene) as onto:
                     yield onto, scene
             else:
                 yield None
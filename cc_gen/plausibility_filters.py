@@ -1,7 +1,17 @@
+from typing import Dict, List
+
 from shapely import affinity
 from shapely.geometry import box
 
-from cc_gen.variation import Scene, Direction, Kind
+from cc_gen.variation import Scene, Direction, Kind, EntityInstance, per_scene
+
+
+@per_scene
+def by_kind(s: Scene) -> Dict[Kind, List[EntityInstance]]:
+    result = dict((k, []) for k in Kind)
+    for e in s:
+        result[e.kind].append(e)
+    return result
 
 
 def no_overlap(s: Scene) -> bool:
@@ -23,18 +33,18 @@ def no_overlap(s: Scene) -> bool:
 
 
 def exactly_one_ego_car(s: Scene) -> bool:
-    return len([e for e in s if e.kind == Kind.Ego]) == 1
+    return len(by_kind(s)[Kind.Ego]) == 1
 
 
 def left_hand_contra_car(s: Scene) -> bool:
-    ego_instance = [e for e in s if e.kind == Kind.Ego][0]
+    ego_instance = by_kind(s)[Kind.Ego][0]
     return all(c.values.distance_lat + c.values.width / 2 < (ego_instance.values.distance_lat - ego_instance.values.width / 2) or c.values.orientation != Direction.South
-               for c in s if c.kind == Kind.Vehicle)
+               for c in by_kind(s)[Kind.Vehicle])
 
 
 def restricted_pedestrian_vertical_movement(s: Scene) -> bool:
-    vehicles_lat = [c.values.distance_lat for c in s if c.kind in (Kind.Ego, Kind.Vehicle)]
+    vehicles_lat = [c.values.distance_lat for c in by_kind(s)[Kind.Ego] + by_kind(s)[Kind.Vehicle]]
     right_far = max(vehicles_lat)
     return all(p.values.distance_lat > right_far or p.values.orientation not in (Direction.North, Direction.South)
-               for p in s if p.kind == Kind.Pedestrian)
+               for p in by_kind(s)[Kind.Pedestrian])
 
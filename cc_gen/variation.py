@@ -1,6 +1,12 @@
+import itertools
+import math
+import random
+import time
+from contextvars import ContextVar
 from dataclasses import dataclass, fields
 from enum import Enum
-from typing import List, Dict, Any, Iterator, Callable, Tuple, Optional
+from functools import wraps
+from typing import List, Dict, Any, Iterator, Callable, Tuple, Optional, Union, TypeVar, Set
 from allpairspy import AllPairs
 
 
@@ -52,15 +58,74 @@ class EntityInstance:
     values: InstanceValues
 
 
+@dataclass(frozen=True)
+class Range:
+    """
+    a numeric interval [low, high] used in place of an explicit value list;
+    discrete with the given step, continuous if no step is given
+    """
+    low: float
+    high: float
+    step: Optional[float] = None
+
+    def __post_init__(self):
+        if self.high < self.low:
+            raise ValueError(f"empty range: {self.low} > {self.high}")
+        if self.step is not None and self.step <= 0:
+            raise ValueError(f"step must be positive, got {self.step}")
+
+    @property
+    def is_continuous(self) -> bool:
+        return self.step is None
+
+    def __len__(self) -> int:
+        if self.is_continuous:
+            raise TypeError("a continuous range has no finite number of values")
+        return int(math.floor((self.high - self.low) / self.step + 1e-9)) + 1
+
+    def __iter__(self) -> Iterator[float]:
+        if self.is_continuous:
+            raise TypeError("a continuous range cannot be enumerated, use sampling instead")
+        return (self._value(i) for i in range(len(self)))
+
+    def _value(self, i: int) -> float:
+        return round(self.low + i * self.step, 10)
+
+    def at(self, u: float) -> float:
+        """ maps u from [0, 1) onto the range """
+        if self.is_continuous:
+            return self.low + u * (self.high - self.low)
+        return self._value(min(int(u * len(self)), len(self) - 1))
+
+
+"""
+a schema field is either an explicit list of values or a numeric range
+"""
+FieldValues = Union[List[Any], Range]
+
+
+def is_varying(values: FieldValues) -> bool:
+    if isinstance(values, Range) and values.is_continuous:
+        return values.high > values.low
+    return len(values) > 1
+
+
+def value_at(values: FieldValues, u: float) -> Any:
+    """ picks the value of a field at position u from [0, 1) """
+    if isinstance(values, Range):
+        return values.at(u)
+    return values[min(int(u * len(values)), len(values) - 1)]
+
+
 @dataclass
 class VariationSchema:
-    velocity: List[float]
+    velocity: FieldValues
     orientation: List[str]
-    width: List[float]
-    length: List[float]
-    height: List[float]
-    distance_lat: List[float]
-    distance_long: List[float]
+    width: FieldValues
+    length: FieldValues
+    height: FieldValues
+    distance_lat: FieldValues
+    distance_long: FieldValues
 
     def num_fields(self) -> int:
         return len(fields(self))
@@ -93,17 +158,150 @@ define a scene as a list of instantiated entities
 Scene = List[EntityInstance]
 
 
+class Sampling:
+    AllPairs = 'all_pairs'
+    Halton = 'halton'
+
+
+def _primes() -> Iterator[int]:
+    found = []
+    for n in itertools.count(2):
+        if all(n % p for p in found if p * p <= n):
+            found.append(n)
+            yield n
+
+
+def radical_inverse(index: int, base: int) -> float:
+    """ the index-th element of the van der Corput sequence in the given base """
+    result, denominator = 0.0, 1.0
+    while index > 0:
+        index, digit = divmod(index, base)
+        denominator *= base
+        result += digit / denominator
+    return result
+
+
+def scrambled_radical_inverse(index: int, base: int, permutations: List[List[int]]) -> float:
+    """ the radical inverse with the k-th digit mapped by the k-th permutation """
+    result, denominator = 0.0, 1.0
+    for permutation in permutations:
+        index, digit = divmod(index, base)
+        denominator *= base
+        result += permutation[digit] / denominator
+    return result
+
+
+def halton(dimensions: int, seed: int = 0) -> Iterator[List[float]]:
+    """
+    streams points of the scrambled Halton sequence in [0, 1)^dimensions;
+    the digits are scrambled by random permutations drawn from the seed, which
+    breaks the correlation between dimensions of neighbouring large bases
+    """
+    bases = list(itertools.islice(_primes(), dimensions))
+    rng = random.Random(seed)
+    # enough digits to reach double precision in every base
+    permutations = [[rng.sample(range(b), b) for _ in range(math.ceil(53 / math.log2(b)))] for b in bases]
+    for index in itertools.count(1):
+        yield [scrambled_radical_inverse(index, b, ps) for b, ps in zip(bases, permutations)]
+
+
+T = TypeVar('T')
+
+"""
+intermediates shared by the filters while a scene is checked by VariationDimensions
+"""
+_shared_intermediates: ContextVar[Optional[Dict[Callable, Tuple[Scene, Any]]]] = \
+    ContextVar('shared_intermediates', default=None)
+
+
+def per_scene(f: Callable[[Scene], T]) -> Callable[[Scene], T]:
+    """
+    shares the result of f between all filters checking the same scene;
+    outside of VariationDimensions.is_plausible, f is simply evaluated
+    """
+    @wraps(f)
+    def wrapper(s: Scene) -> T:
+        cache = _shared_intermediates.get()
+        if cache is None:
+            return f(s)
+        if f not in cache or cache[f][0] is not s:
+            cache[f] = (s, f(s))
+        return cache[f][1]
+
+    return wrapper
+
+
+@dataclass
+class FilterStatistics:
+    calls: int = 0
+    rejections: int = 0
+    total_time: float = 0.0
+
+    @property
+    def mean_time(self) -> float:
+        return self.total_time / self.calls if self.calls else 0.0
+
+    @property
+    def rejection_rate(self) -> float:
+        return self.rejections / self.calls if self.calls else 0.0
+
+    def expected_cost(self) -> float:
+        """ expected time spent per rejected scene, with a smoothed rejection rate """
+        return self.mean_time * (self.calls + 2) / (self.rejections + 1)
+
+
 class VariationDimensions:
     def __init__(self,
                  filters: Optional[List[Callable[[Scene], bool]]],
-                 variations: List[EntityVariation]):
+                 variations: List[EntityVariation],
+                 sampling: str = Sampling.AllPairs,
+                 num_samples: Optional[int] = None,
+                 seed: int = 0,
+                 adaptive_filters: bool = True):
+        """
+        in AllPairs mode, all field values are materialized and combined pairwise;
+        in Halton mode, scenes are streamed from a low-discrepancy sequence over the
+        fields without materializing them (endless if num_samples is None, a single
+        scene if no field varies).
+
+        calls, rejections and run time of each filter are recorded in `statistics`; with
+        adaptive_filters, the filters are reordered on the fly so that cheap filters which
+        reject often run first. a filter that raises, e.g. because it relies on an earlier
+        filter as a guard, is pinned to its listed position from then on, and the scene gets
+        the decision or error it would have got in the listed order.
+        """
+        if sampling not in (Sampling.AllPairs, Sampling.Halton):
+            raise ValueError(f"unknown sampling mode: {sampling}")
         self.filters = filters
         self.variations = variations
+        self.sampling = sampling
+        self.num_samples = num_samples
+        self.seed = seed
+        self.adaptive_filters = adaptive_filters
+        self.statistics: Dict[Callable[[Scene], bool], FilterStatistics] = {}
+        self.pinned_filters: Set[Callable[[Scene], bool]] = set()
+
+    def to_fields(self) -> List[FieldValues]:
+        return [getattr(v.schema, f.name) for v in self.variations for f in fields(v.schema)]
 
     def to_list(self) -> List[List[Any]]:
-        result = [getattr(v.schema, f.name) for v in self.variations for f in fields(v.schema)]
+        result = [list(f) for f in self.to_fields()]
         return result
 
+    def sample(self) -> Iterator[List[Any]]:
+        columns = self.to_fields()
+        varying = [i for i, c in enumerate(columns) if is_varying(c)]
+        points = halton(len(varying), self.seed)
+        if not varying:
+            points = itertools.islice(points, 1)
+        if self.num_samples is not None:
+            points = itertools.islice(points, self.num_samples)
+        for point in points:
+            entry = [value_at(c, 0.0) for c in columns]
+            for i, u in zip(varying, point):
+                entry[i] = value_at(columns[i], u)
+            yield entry
+
     def instantiate(self, combination: List[Any]) -> Scene:
         index = 0
         result = []
@@ -113,7 +311,64 @@ class VariationDimensions:
             index += v.schema.num_fields()
         return result
 
+    def combinations(self) -> Iterator[List[Any]]:
+        if self.sampling == Sampling.Halton:
+            return self.sample()
+        return iter(AllPairs(self.to_list()))
+
+    def ordered_filters(self) -> List[Callable[[Scene], bool]]:
+        for f in self.filters:
+            self.statistics.setdefault(f, FilterStatistics())
+        if not self.adaptive_filters:
+            return self.filters
+
+        def predecessors(f: Callable[[Scene], bool]) -> List[Callable[[Scene], bool]]:
+            listed_before = self.filters[:self.filters.index(f)]
+            if f in self.pinned_filters:
+                return listed_before
+            return [g for g in listed_before if g in self.pinned_filters]
+
+        pending = sorted(self.filters, key=lambda f: self.statistics[f].expected_cost())
+        result = []
+        while pending:
+            f = next(f for f in pending if all(g in result for g in predecessors(f)))
+            pending.remove(f)
+            result.append(f)
+        return result
+
+    def apply(self, f: Callable[[Scene], bool], scene: Scene) -> bool:
+        stats = self.statistics[f]
+        start = time.perf_counter()
+        try:
+            accepted = f(scene)
+        finally:
+            stats.total_time += time.perf_counter() - start
+            stats.calls += 1
+        if not accepted:
+            stats.rejections += 1
+        return accepted
+
+    def is_plausible(self, scene: Scene) -> bool:
+        token = _shared_intermediates.set({})
+        try:
+            passed = []
+            for f in self.ordered_filters():
+                try:
+                    if not self.apply(f, scene):
+                        return False
+                except Exception as e:
+                    # in the listed order, only the filters before f could have rejected the scene
+                    self.pinned_filters.add(f)
+                    for g in self.filters[:self.filters.index(f)]:
+                        if g not in passed and not self.apply(g, scene):
+                            return False
+                    raise e
+                passed.append(f)
+            return True
+        finally:
+            _shared_intermediates.reset(token)
+
     def __iter__(self) -> Iterator[Optional[Scene]]:
-        for entry in AllPairs(self.to_list()):
+        for entry in self.combinations():
             scene = self.instantiate(entry)
-            yield scene if not self.filters or all(f(scene) for f in self.filters) else None
+            yield scene if not self.filters or self.is_plausible(scene) else None
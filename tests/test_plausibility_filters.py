@@ -0,0 +1,48 @@
+from cc_gen.plausibility_filters import *
+from cc_gen.variation import InstanceValues, VariationDimensions
+
+
+def _scene(*entities) -> Scene:
+    return [EntityInstance(kind, name, InstanceValues(0, orientation, 1.8, 4.5, 1.6, lat, long))
+            for kind, name, orientation, lat, long in entities]
+
+
+def test_no_overlap():
+    assert no_overlap(_scene((Kind.Ego, 'ego', Direction.North, 0, 0),
+                             (Kind.Vehicle, 'car', Direction.North, 3.5, 0)))
+    assert not no_overlap(_scene((Kind.Ego, 'ego', Direction.North, 0, 0),
+                                 (Kind.Vehicle, 'car', Direction.North, 1, 2)))
+
+
+def test_left_hand_contra_car():
+    assert left_hand_contra_car(_scene((Kind.Ego, 'ego', Direction.North, 0, 0),
+                                       (Kind.Vehicle, 'car', Direction.South, -3.5, 10)))
+    assert not left_hand_contra_car(_scene((Kind.Ego, 'ego', Direction.North, 0, 0),
+                                           (Kind.Vehicle, 'car', Direction.South, 3.5, 10)))
+
+
+def test_filters_see_changed_scene():
+    s = _scene((Kind.Ego, 'ego', Direction.North, 0, 0),
+               (Kind.Vehicle, 'car', Direction.North, 3.5, 0))
+    assert no_overlap(s) and exactly_one_ego_car(s)
+    s[1].values.distance_lat = 0.5
+    s[1].kind = Kind.Ego
+    assert not no_overlap(s)
+    assert not exactly_one_ego_car(s)
+
+
+def test_intermediates_are_shared_while_checking_a_scene():
+    calls = []
+
+    @per_scene
+    def egos(s: Scene):
+        calls.append(s)
+        return [e for e in s if e.kind == Kind.Ego]
+
+    s = _scene((Kind.Ego, 'ego', Direction.North, 0, 0))
+    vd = VariationDimensions([lambda x: len(egos(x)) == 1, lambda x: egos(x)[0].name == 'ego'], [])
+    assert vd.is_plausible(s)
+    assert len(calls) == 1
+    egos(s)
+    egos(s)
+    assert len(calls) == 3
@@ -1,7 +1,10 @@
+from owlready2 import Imp
+
 from cc_gen.generator import SceneGenerator
 from cc_gen.plausibility_filters import no_overlap
 from cc_gen.root_domain import create_root_domain
-from cc_gen.variation import EntityVariation, VariationSchema, Direction, Kind, Scene, VariationDimensions
+from cc_gen.variation import EntityVariation, VariationSchema, Direction, Kind, Scene, VariationDimensions, \
+    EntityInstance, InstanceValues
 
 
 BASE_IRI = "http://occd-test.com"
@@ -91,3 +94,95 @@ def test_scene_is_plausible_longitudinal_disjoint():
     variation_dimensions = VariationDimensions([no_overlap], variations)
     generator = SceneGenerator(variation_dimensions, create_root_domain, BASE_IRI)
     assert all(distances_unequal(r[1]) for r in generator if r)
+
+
+def create_test_domain(ontology):
+    create_root_domain(ontology)
+    with ontology:
+        class OnTheRight(ontology.Entity):
+            pass
+
+        Imp('on_the_right_rule').set_as_rule("""
+            EgoCar(?x), has_lateral_distance(?x, ?ego_lat),
+            Entity(?e), has_lateral_distance(?e, ?l),
+            greaterThan(?l, ?ego_lat) -> OnTheRight(?e)
+        """)
+
+        class Occluded(ontology.Entity):
+            equivalent_to = [ontology.has_reduced_height.min(1)]
+
+
+def test_incremental_reasoning_equals_full_reasoning():
+    def snapshot(onto, scene: Scene):
+        return ({e.name: (sorted(c.name for c in onto[e.name].is_a),
+                          sorted(onto[e.name].reduced_height),
+                          onto[e.name].lateral_distance,
+                          onto[e.name].euclidean_distance)
+                 for e in scene},
+                sorted(i.name for i in onto.Occluded.instances()),
+                sorted(i.name for i in onto.OnTheRight.instances()))
+
+    variations = [
+        EntityVariation(
+            kind=Kind.Ego,
+            name='ego',
+            schema=VariationSchema(
+                velocity=[25],
+                orientation=[Direction.North],
+                width=[1.8],
+                length=[4.5],
+                height=[1.6],
+                distance_lat=[0, 1],
+                distance_long=[0]
+            )
+        ),
+        EntityVariation(
+            kind=Kind.Vehicle,
+            name='car',
+            schema=VariationSchema(
+                velocity=[0],
+                orientation=[Direction.North],
+                width=[1.8],
+                length=[4.5],
+                height=[1.5, 1.9],
+                distance_lat=[3.5],
+                distance_long=[-3]
+            )
+        ),
+        EntityVariation(
+            kind=Kind.Pedestrian,
+            name='ped',
+            schema=VariationSchema(
+                velocity=[0, 3],
+                orientation=[Direction.West, Direction.North],
+                width=[0.5],
+                length=[0.3],
+                height=[1.7],
+                distance_lat=[-2, 5],
+                distance_long=[3]
+            )
+        )
+    ]
+
+    variation_dimensions = VariationDimensions([], variations)
+    full = [snapshot(*r) for r in SceneGenerator(variation_dimensions, create_test_domain, BASE_IRI)]
+
+    incremental = []
+    ontologies = set()
+    for onto, scene in SceneGenerator(variation_dimensions, create_test_domain, BASE_IRI,
+                                      incremental=True, max_changes=14):
+        incremental.append(snapshot(onto, scene))
+        ontologies.add(id(onto))
+
+    assert len(full) > 2
+    assert len(ontologies) == 1
+    assert incremental == full
+
+
+def test_changed_fields():
+    def scene(lat: float, name: str = 'ped') -> Scene:
+        return [EntityInstance(Kind.Pedestrian, name, InstanceValues(0, Direction.North, .5, .3, 1.7, lat, 0))]
+
+    assert SceneGenerator.changed_fields(scene(1), scene(1)) == []
+    assert SceneGenerator.changed_fields(scene(1), scene(2)) == [(scene(2)[0], 'distance_lat')]
+    assert SceneGenerator.changed_fields(scene(1), scene(1, 'other')) is None
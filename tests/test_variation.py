@@ -1,3 +1,6 @@
+import itertools
+import math
+import time
 import pytest
 from cc_gen.variation import *
 
@@ -188,3 +191,197 @@ def _assert_compare_combination_with_instance(combination: List[Any],
     assert values.length == combination[offset + indexes.get('length')]
     assert values.distance_lat == combination[offset + indexes.get('distance_lat')]
     assert values.distance_long == combination[offset + indexes.get('distance_long')]
+
+
+def test_range_discrete_values():
+    assert list(Range(0.5, 1.5, 0.25)) == [0.5, 0.75, 1.0, 1.25, 1.5]
+    assert len(Range(-1, 1, 0.1)) == 21
+
+
+def test_range_continuous_cannot_be_enumerated():
+    with pytest.raises(TypeError):
+        list(Range(0, 1))
+
+
+def test_range_at():
+    assert Range(0, 10).at(0.25) == 2.5
+    assert Range(0, 10, 5).at(0.0) == 0
+    assert Range(0, 10, 5).at(0.5) == 5
+    assert Range(0, 10, 5).at(0.99) == 10
+
+
+def test_range_is_materialized_for_all_pairs(entity_variation: EntityVariation):
+    entity_variation.schema.distance_lat = Range(40, 50, 5)
+    vd = VariationDimensions([], [entity_variation])
+    indexes = entity_variation.schema.get_field_indexes()
+    assert vd.to_list()[indexes.get('distance_lat')] == [40, 45, 50]
+
+
+def test_halton_points_are_reproducible():
+    xs = list(itertools.islice(halton(3, seed=7), 20))
+    ys = list(itertools.islice(halton(3, seed=7), 20))
+    assert xs == ys
+    assert all(0 <= u < 1 for p in xs for u in p)
+    assert xs != list(itertools.islice(halton(3, seed=8), 20))
+
+
+def test_radical_inverse():
+    assert [radical_inverse(i, 2) for i in range(1, 5)] == [0.5, 0.25, 0.75, 0.125]
+    assert radical_inverse(1, 3) == pytest.approx(1 / 3)
+
+
+def test_halton_is_stratified():
+    # each of the first 2 * 3 points falls into a different third of the base-3 dimension
+    points = list(itertools.islice(halton(2, seed=5), 6))
+    assert sorted(int(p[1] * 3) for p in points) == [0, 0, 1, 1, 2, 2]
+    assert sorted(int(p[0] * 2) for p in points) == [0, 0, 0, 1, 1, 1]
+
+
+def test_halton_high_dimensions_are_uncorrelated():
+    # plain Halton puts the first points of bases 41 and 43 (dimensions 13 and 14) on a diagonal
+    def correlation(xs, ys):
+        mx, my = sum(xs) / len(xs), sum(ys) / len(ys)
+        cov = sum((x - mx) * (y - my) for x, y in zip(xs, ys))
+        return cov / math.sqrt(sum((x - mx) ** 2 for x in xs) * sum((y - my) ** 2 for y in ys))
+
+    for seed in range(5):
+        points = list(itertools.islice(halton(14, seed=seed), 200))
+        assert abs(correlation([p[12] for p in points], [p[13] for p in points])) < .2
+
+
+def test_sampling_continuous_ranges(ego_variation: EntityVariation, entity_variation: EntityVariation):
+    entity_variation.schema.distance_lat = Range(-2.0, 2.0)
+    entity_variation.schema.distance_long = Range(0.0, 10.0, 0.5)
+    vd = VariationDimensions([], [ego_variation, entity_variation],
+                             sampling=Sampling.Halton, num_samples=50, seed=1)
+    scenes = list(vd)
+    assert len(scenes) == 50
+    peds = [s[1].values for s in scenes]
+    assert all(-2.0 <= p.distance_lat <= 2.0 for p in peds)
+    assert all(p.distance_long in list(Range(0.0, 10.0, 0.5)) for p in peds)
+    assert all(p.width == 1.0 for p in peds)
+    assert len(set(p.distance_lat for p in peds)) == 50
+    assert [s[1].values for s in vd] == peds
+
+
+def test_sampling_applies_filters(ego_variation: EntityVariation, entity_variation: EntityVariation):
+    entity_variation.schema.distance_lat = Range(-2.0, 2.0)
+    vd = VariationDimensions([lambda s: s[1].values.distance_lat > 0], [ego_variation, entity_variation],
+                             sampling=Sampling.Halton, num_samples=20, seed=3)
+    scenes = list(vd)
+    assert any(s is None for s in scenes)
+    assert all(s[1].values.distance_lat > 0 for s in scenes if s is not None)
+
+
+def test_sampling_without_varying_fields(entity_variation: EntityVariation):
+    entity_variation.schema.velocity = [10.0]
+    entity_variation.schema.orientation = [Direction.North]
+    entity_variation.schema.distance_lat = Range(40, 40)
+    entity_variation.schema.distance_long = Range(45, 45, 1)
+    vd = VariationDimensions([], [entity_variation], sampling=Sampling.Halton)
+    scenes = list(vd)
+    assert len(scenes) == 1
+    assert scenes[0][0].values.distance_lat == 40
+
+
+def test_constant_range_is_not_varying():
+    assert not is_varying(Range(1, 1))
+    assert not is_varying(Range(1, 1, .5))
+    assert not is_varying([1])
+    assert is_varying(Range(1, 2))
+
+
+def test_unknown_sampling_mode(entity_variation: EntityVariation):
+    with pytest.raises(ValueError):
+        VariationDimensions([], [entity_variation], sampling='grid')
+
+
+def test_filter_statistics(ego_variation: EntityVariation, entity_variation: EntityVariation):
+    def slow_south(scene: Scene) -> bool:
+        time.sleep(.001)
+        return scene[1].values.orientation != Direction.South
+
+    def fast_far(scene: Scene) -> bool:
+        return scene[1].values.distance_lat > 40
+
+    vd = VariationDimensions([slow_south, fast_far], [ego_variation, entity_variation])
+    scenes = list(vd)
+
+    rejected = sum(s is None for s in scenes)
+    assert rejected == vd.statistics[slow_south].rejections + vd.statistics[fast_far].rejections
+    assert all(st.calls >= st.rejections for st in vd.statistics.values())
+    assert vd.statistics[slow_south].mean_time > vd.statistics[fast_far].mean_time
+    assert vd.ordered_filters() == [fast_far, slow_south]
+
+
+def test_adaptive_filters_reorder_by_cost(ego_variation: EntityVariation, entity_variation: EntityVariation):
+    calls = {'slow': 0, 'fast': 0}
+
+    def slow_rarely_rejecting(scene: Scene) -> bool:
+        calls['slow'] += 1
+        time.sleep(.002)
+        return scene[1].values.velocity < 20
+
+    def fast_often_rejecting(scene: Scene) -> bool:
+        calls['fast'] += 1
+        return scene[1].values.distance_lat > 40 and scene[1].values.distance_long > 45
+
+    variations = [ego_variation, entity_variation]
+    fixed = list(VariationDimensions([slow_rarely_rejecting, fast_often_rejecting], variations,
+                                     adaptive_filters=False))
+    fixed_calls = dict(calls)
+    calls.update(slow=0, fast=0)
+    vd = VariationDimensions([slow_rarely_rejecting, fast_often_rejecting], variations)
+    assert list(vd) == fixed
+    assert vd.ordered_filters() == [fast_often_rejecting, slow_rarely_rejecting]
+    assert calls['slow'] < fixed_calls['slow']
+
+
+def test_adaptive_filters_respect_guards(entity_variation: EntityVariation):
+    def exactly_one_ego(scene: Scene) -> bool:
+        return len([e for e in scene if e.kind == Kind.Ego]) == 1
+
+    def ego_is_slow(scene: Scene) -> bool:
+        return [e for e in scene if e.kind == Kind.Ego][0].values.velocity < 15
+
+    filters = [exactly_one_ego, ego_is_slow]
+    expected = list(VariationDimensions(filters, [entity_variation], adaptive_filters=False))
+    vd = VariationDimensions(filters, [entity_variation])
+    assert list(vd) == expected
+    assert all(s is None for s in expected)
+    assert vd.statistics[exactly_one_ego].rejections == len(expected)
+    # the dependent filter raised once, was counted, and runs behind its guard from then on
+    assert vd.statistics[ego_is_slow].calls == 1
+    assert vd.pinned_filters == {ego_is_slow}
+    assert vd.ordered_filters() == [exactly_one_ego, ego_is_slow]
+
+
+def test_adaptive_filters_keep_errors(entity_variation: EntityVariation):
+    def broken(scene: Scene) -> bool:
+        raise ValueError('broken filter')
+
+    def accept_all(scene: Scene) -> bool:
+        return True
+
+    def reject_all(scene: Scene) -> bool:
+        return False
+
+    scene = VariationDimensions([], [entity_variation]).instantiate(
+        [10.0, Direction.North, 1.0, 5.0, 2.0, 40, 45])
+
+    for guard, decision in ((accept_all, None), (reject_all, False)):
+        fixed = VariationDimensions([guard, broken], [entity_variation], adaptive_filters=False)
+        vd = VariationDimensions([guard, broken], [entity_variation])
+        # make the broken filter look cheap, so that it runs first
+        vd.statistics[guard] = FilterStatistics(calls=10, rejections=0, total_time=1.0)
+        vd.statistics[broken] = FilterStatistics(calls=10, rejections=10, total_time=0.0)
+        assert vd.ordered_filters() == [broken, guard]
+        if decision is None:
+            for v in (fixed, vd):
+                with pytest.raises(ValueError):
+                    v.is_plausible(scene)
+        else:
+            assert fixed.is_plausible(scene) is decision
+            assert vd.is_plausible(scene) is decision
+        assert vd.statistics[guard].calls == 11
+        assert vd.statistics[broken].calls == 11